@@ -1,9 +1,10 @@
 import * as config from './modules/config.js';
-import { generateTimestampId } from './modules/utils.js';
+import { generateTimestampId, decodeColumnarDataset } from './modules/utils.js';
 import { cytoscapeStylesheet } from './modules/cytoscape-styles.js';
 import { createElementsFromDataset, createUnderlayNodeElement, createCoordinateSpaceDebugRectangle } from './modules/element-creators.js';
 import * as versioning from './modules/versioning.js';
 import * as ui from './modules/ui-interactions.js';
+import { setupLevelOfDetail } from './modules/level-of-detail.js';
 
 // STEP 1: Load ALL Data (Global variables for data)
 let metroData = {};
@@ -12,6 +13,7 @@ let funicularData = {};
 let metrobusData = {};
 let figmaCoordinates = {};
 let globalLineColors = {};
+let zoomLevels = null;
 
 // --- Main Application State ---
 const mainState = {
@@ -31,22 +33,39 @@ mainState.originalLayoutDataRef.current = mainState.originalLayoutData;
 
 let allElements = []; 
 
+// Prefers the compact columnar file written by scripts/consolidate.py (--formats columnar),
+// falling back to the indented .json if it is missing or unreadable.
+function fetchDataset(basePath) {
+  return fetch(`${basePath}.columnar.json`)
+    .then(response => {
+      if (!response.ok) throw new Error(`HTTP ${response.status}`);
+      return response.json();
+    })
+    .then(decodeColumnarDataset)
+    .catch(error => {
+      console.warn(`Columnar dataset ${basePath}.columnar.json unavailable (${error.message}). Falling back to .json.`);
+      return fetch(`${basePath}.json`).then(response => response.json());
+    });
+}
+
 // --- DATA FETCHING AND CYTOSCAPE INITIALIZATION ---
 Promise.all([
-  fetch('./data/metro_data.json').then(response => response.json()),
-  fetch('./data/tram_data.json').then(response => response.json()),
-  fetch('./data/funicular_data.json').then(response => response.json()),
-  fetch('./data/metrobus_data.json').then(response => response.json()),
+  fetchDataset('./data/metro_data'),
+  fetchDataset('./data/tram_data'),
+  fetchDataset('./data/funicular_data'),
+  fetchDataset('./data/metrobus_data'),
   fetch('./data/figma_coordinates.json').then(response => response.json()),
-  fetch('./data/colors.json').then(response => response.json())
+  fetch('./data/colors.json').then(response => response.json()),
+  fetch(config.ZOOM_LEVELS_URL).then(response => response.ok ? response.json() : null).catch(() => null) // Optional
 ])
-.then(([metroJson, tramJson, funicularJsonData, metrobusJsonData, figmaCoordsData, colorsJson]) => {
+.then(([metroJson, tramJson, funicularJsonData, metrobusJsonData, figmaCoordsData, colorsJson, zoomLevelsJson]) => {
   metroData = metroJson; 
   tramData = tramJson; 
   funicularData = funicularJsonData; 
   metrobusData = metrobusJsonData; 
   figmaCoordinates = figmaCoordsData; 
   globalLineColors = colorsJson.line_colors || {};
+  zoomLevels = zoomLevelsJson;
   
   allElements = []; 
 
@@ -127,6 +146,7 @@ function setupInitialLayoutAndListeners() {
     ui.setupCytoscapeEventListeners(mainState);
     ui.setupGlobalEventListeners(mainState); 
     ui.setupLayerToggles(mainState.cy); 
+    setupLevelOfDetail(mainState.cy, zoomLevels);
 
     const unpositionedNodes = mainState.cy.nodes('[!hasFigmaCoord]');
     const positionedNodes = mainState.cy.nodes('[hasFigmaCoord]');
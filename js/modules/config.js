@@ -26,6 +26,12 @@ export const UNDERLAY_IMAGE_URL = 'assets/map-underlay.png';
 export const IMAGE_ACTUAL_WIDTH = 3306; 
 export const IMAGE_ACTUAL_HEIGHT = IMAGE_ACTUAL_WIDTH / 1.58; // divided by aspect ratio
 
+// --- LEVEL OF DETAIL ---
+// Rebuilt by every full build (scripts/consolidate.py without --types, or a registry network with
+// "zoom_levels"); scripts/build_zoom_levels.py can also be run alone. If the file is missing,
+// every station stays visible.
+export const ZOOM_LEVELS_URL = './data/zoom_levels.min.json';
+
 
 
 // Manual pixel offsets to nudge the underlay image for perfect alignment.
@@ -39,6 +39,25 @@ export const cytoscapeStylesheet = [
       'background-color': 'data(figmaColor)' 
     }
   },
+  {
+    selector: 'node.lod-hidden', // Station folded into a cluster at the current zoom level
+    style: {
+      'label': '',
+      'width': '4px',
+      'height': '4px',
+      'border-width': 0,
+      'events': 'no'
+    }
+  },
+  {
+    selector: 'node.lod-aggregate', // Cluster representative at the current zoom level
+    style: {
+      'label': 'data(lodLabel)',
+      'font-weight': 'bold',
+      'width': '14px',
+      'height': '14px'
+    }
+  },
   {
     selector: 'node.underlay-node',
     style: {
@@ -0,0 +1,103 @@
+// js/modules/level-of-detail.js
+// Switches detail levels on zoom using the precomputed artifact from scripts/build_zoom_levels.py.
+// Nothing is evaluated per element at zoom time: each level carries the group of stations it hides
+// (relative to the previous level) and its aggregated clusters, so a level change only toggles the
+// groups between the old and new level.
+
+let lodState = null; // { cy, levels, activeLevel, aggregateNodes, substituteNodes }
+
+/**
+ * Resolves the artifact's station indices into Cytoscape collections, once.
+ * @param {object} cyInstance - The Cytoscape instance.
+ * @param {object} zoomLevels - Parsed zoom_levels artifact ({ stations, levels }).
+ * @returns {Array<object>} Per level: { minZoom, hideNodes, aggregates: [[repNode, ...memberNodes]] }.
+ */
+function resolveLevels(cyInstance, zoomLevels) {
+  const nodeAt = index => cyInstance.getElementById(zoomLevels.stations[index]);
+  return zoomLevels.levels.map(level => ({
+    minZoom: level.minZoom,
+    hideNodes: cyInstance.collection(level.hide.map(nodeAt).filter(node => node.length > 0)),
+    aggregates: level.clusters
+      .map(([repIndex, memberIndices]) => [repIndex, ...memberIndices].map(nodeAt).filter(node => node.length > 0))
+      .filter(members => members.length > 0)
+  }));
+}
+
+function levelForZoom(levels, zoom) {
+  const index = levels.findIndex(level => zoom >= level.minZoom);
+  return index === -1 ? levels.length - 1 : index;
+}
+
+/**
+ * Marks each cluster's representative at the active level. Members are in priority order, so if
+ * the representative's layer is switched off the next displayed member stands in for the cluster.
+ */
+function showAggregates() {
+  lodState.levels[lodState.activeLevel].aggregates.forEach(members => {
+    const displayed = members.filter(node => node.style('display') !== 'none');
+    if (displayed.length === 0) return;
+    const representative = displayed[0];
+    if (representative !== members[0]) {
+      representative.removeClass('lod-hidden');
+      lodState.substituteNodes.push(representative);
+    }
+    if (displayed.length > 1) {
+      representative.data('lodLabel', `${representative.data('name')} (+${displayed.length - 1})`);
+      representative.addClass('lod-aggregate');
+      lodState.aggregateNodes.push(representative);
+    }
+  });
+}
+
+function clearAggregates() {
+  lodState.aggregateNodes.forEach(node => node.removeClass('lod-aggregate'));
+  lodState.substituteNodes.forEach(node => node.addClass('lod-hidden'));
+  lodState.aggregateNodes = [];
+  lodState.substituteNodes = [];
+}
+
+function switchLevel(targetLevel) {
+  const { cy, levels, activeLevel } = lodState;
+  if (targetLevel === activeLevel) return;
+  cy.batch(function() {
+    clearAggregates();
+    if (targetLevel > activeLevel) {
+      for (let k = activeLevel + 1; k <= targetLevel; k++) levels[k].hideNodes.addClass('lod-hidden');
+    } else {
+      for (let k = activeLevel; k > targetLevel; k--) levels[k].hideNodes.removeClass('lod-hidden');
+    }
+    lodState.activeLevel = targetLevel;
+    showAggregates();
+  });
+}
+
+/**
+ * Re-picks cluster representatives after layer visibility changes (see ui.applyLayerVisibility).
+ * No-op until setupLevelOfDetail has run.
+ */
+export function refreshLevelOfDetail() {
+  if (!lodState) return;
+  lodState.cy.batch(function() {
+    clearAggregates();
+    showAggregates();
+  });
+}
+
+/**
+ * Applies the detail level for the current zoom and keeps it in sync on every zoom change.
+ * @param {object} cyInstance - The Cytoscape instance.
+ * @param {object} zoomLevels - Parsed zoom_levels artifact, or null to leave every station visible.
+ */
+export function setupLevelOfDetail(cyInstance, zoomLevels) {
+  if (!cyInstance || !zoomLevels || !zoomLevels.levels || zoomLevels.levels.length === 0) {
+    console.log("Level of detail disabled (no zoom levels artifact).");
+    return;
+  }
+  const levels = resolveLevels(cyInstance, zoomLevels);
+  lodState = { cy: cyInstance, levels, activeLevel: 0, aggregateNodes: [], substituteNodes: [] };
+  switchLevel(levelForZoom(levels, cyInstance.zoom()));
+  cyInstance.on('zoom', function() {
+    switchLevel(levelForZoom(levels, cyInstance.zoom()));
+  });
+  console.log(`Level of detail enabled with ${levels.length} levels.`);
+}
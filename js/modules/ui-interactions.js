@@ -2,6 +2,7 @@
 import * as config from './config.js';
 import * as versioning from './versioning.js';
 import { generateTimestampId } from './utils.js';
+import { refreshLevelOfDetail } from './level-of-detail.js';
 
 let selectedNodeForLabeling = null;
 
@@ -37,6 +38,7 @@ export function applyLayerVisibility(cyInstance) {
             underlayNodeCy.style('display', layerVisibilityState.underlay ? 'element' : 'none');
         }
     });
+    refreshLevelOfDetail(); // Cluster representatives may have been hidden with their layer
     console.log("Applied layer visibility (from ui-interactions.js):", layerVisibilityState);
 }
 
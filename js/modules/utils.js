@@ -6,4 +6,40 @@
  */
 export function generateTimestampId() {
   return `layout_${new Date().toISOString()}`;
-}
\ No newline at end of file
+}
+
+/**
+ * Rebuilds a dataset written in the columnar layout by scripts/consolidate.py (--formats columnar).
+ * Parallel per-field arrays are zipped back into records and string-table indices are resolved.
+ * Payloads that are not columnar are returned unchanged, so callers can pass either layout.
+ * @param {object} payload - Parsed JSON from a *.columnar.json file.
+ * @returns {object} The dataset in its usual { stations: [...], lines: [...], ... } shape.
+ */
+export function decodeColumnarDataset(payload) {
+  if (!payload || payload.format !== 'columnar') return payload;
+  const strings = payload.strings;
+  const decoders = {
+    str: v => (v === null ? null : strings[v]),
+    str_list: v => v.map(i => strings[i]),
+    raw: v => v
+  };
+  const data = {};
+  payload.order.forEach(key => {
+    if (key in payload.extra) {
+      data[key] = payload.extra[key];
+      return;
+    }
+    const table = payload.tables[key];
+    const records = Array.from({ length: table.length }, () => ({}));
+    table.fields.forEach(field => {
+      const column = table.columns[field];
+      const decode = decoders[column.kind];
+      const absentRows = new Set(column.absent || []);
+      column.values.forEach((value, row) => {
+        if (!absentRows.has(row)) records[row][field] = decode(value);
+      });
+    });
+    data[key] = records;
+  });
+  return data;
+}
@@ -0,0 +1,212 @@
+import json
+import math
+import argparse # For command-line arguments
+
+from consolidate import write_output, read_output, parse_formats
+
+# --- Zoom-Level Clustering ---
+# Stations are clustered greedily, level by level, on a spatial grid. Each level merges the
+# representatives of the previous level that lie within that level's radius, so the levels
+# form a hierarchy and visibility is monotonic: a station hidden at level k stays hidden at
+# every coarser level. The viewer only toggles the per-level "hide" groups when zoom changes.
+# consolidate.py runs this stage after every full build, so running this script by hand is
+# only needed after editing figma_coordinates.json.
+DEFAULT_RADII = [30, 60, 120, 240] # Coordinate units, one coarser level per radius
+DEFAULT_SCREEN_SEPARATION = 24 # Minimum on-screen pixels between visible stations
+
+def load_station_priorities(system_json_path):
+    """
+    Builds {station_id: (is_interchange, line_count)} from consolidated system data.
+    Interchanges rank first, then stations served by more lines/transfers.
+    """
+    try:
+        system_data = read_output(system_json_path) # Any format written by consolidate.py
+    except FileNotFoundError:
+        print(f"Warning: System JSON '{system_json_path}' not found. All stations get equal priority.")
+        return {}
+    except ValueError: # json.JSONDecodeError and msgpack decode errors
+        print(f"Warning: Error decoding system JSON '{system_json_path}'. All stations get equal priority.")
+        return {}
+
+    priorities = {}
+    for station in system_data.get("stations", []):
+        line_count = len(set(station.get("lines", [])) | set(station.get("transfers", [])))
+        priorities[station["id"]] = (bool(station.get("isInterchange")), line_count)
+    return priorities
+
+def station_rank(station_id, priorities):
+    """Sort key: interchanges first, then more lines/transfers, then id for a stable order."""
+    is_interchange, line_count = priorities.get(station_id, (False, 0))
+    return (not is_interchange, -line_count, station_id)
+
+def min_station_spacing(positions):
+    """Smallest non-zero distance between two stations (coincident stations can't be separated)."""
+    points = list(positions.values())
+    return min((math.hypot(ax - bx, ay - by) for i, (ax, ay) in enumerate(points) for bx, by in points[i + 1:]
+                if (ax, ay) != (bx, by)), default=0)
+
+def cluster_level(clusters, radius, positions, priorities):
+    """
+    Merges clusters (dicts with 'rep' and 'members') whose representatives lie within radius.
+    Higher-priority representatives are visited first and absorb their unclaimed neighbours,
+    so interchanges stay visible as cluster representatives as long as possible. Surviving
+    representatives are therefore always more than radius apart.
+    """
+    def rank(cluster):
+        return (*station_rank(cluster["rep"], priorities)[:2], -len(cluster["members"]), cluster["rep"])
+
+    ordered = sorted(clusters, key=rank)
+
+    # Spatial grid with cell size == radius, so neighbours are always in the 3x3 block
+    grid = {}
+    for index, cluster in enumerate(ordered):
+        x, y = positions[cluster["rep"]]
+        grid.setdefault((math.floor(x / radius), math.floor(y / radius)), []).append(index)
+
+    claimed = [False] * len(ordered)
+    merged = []
+    for index, cluster in enumerate(ordered):
+        if claimed[index]:
+            continue
+        claimed[index] = True
+        x, y = positions[cluster["rep"]]
+        cell_x, cell_y = math.floor(x / radius), math.floor(y / radius)
+        members = list(cluster["members"])
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for other_index in grid.get((cell_x + dx, cell_y + dy), []):
+                    if claimed[other_index]:
+                        continue
+                    other_x, other_y = positions[ordered[other_index]["rep"]]
+                    if math.hypot(other_x - x, other_y - y) <= radius:
+                        claimed[other_index] = True
+                        members.extend(ordered[other_index]["members"])
+        merged.append({"rep": cluster["rep"], "members": members})
+    return merged
+
+def build_zoom_levels(positions, priorities, radii, screen_separation):
+    """
+    Computes the level-of-detail hierarchy.
+    Level 0 shows every station; level k uses radii[k-1]. The viewer uses the finest level
+    whose minZoom is <= its zoom; minZoom is screen_separation divided by the level's own
+    station spacing (the smallest station distance for level 0, the radius otherwise), so
+    visible stations are at least screen_separation pixels apart on screen. Below the
+    coarsest level's minZoom the coarsest level stays active.
+    Returns the compact artifact:
+      stations: station ids, referenced everywhere else by index
+      levels[k]: radius, minZoom, hide (indices newly hidden at this level),
+                 clusters ([rep index, [other member indices]] for multi-member clusters,
+                 members in priority order so the viewer can fall back to the next one)
+    """
+    station_ids = sorted(positions.keys())
+    station_index = {station_id: i for i, station_id in enumerate(station_ids)}
+
+    level_radii = [0] + sorted(radii)
+    levels = []
+    clusters = [{"rep": station_id, "members": [station_id]} for station_id in station_ids]
+    previous_visible = set(station_ids)
+    base_spacing = min_station_spacing(positions)
+
+    for level, radius in enumerate(level_radii):
+        if radius > 0:
+            clusters = cluster_level(clusters, radius, positions, priorities)
+        visible = {cluster["rep"] for cluster in clusters}
+        level_spacing = radius if radius > 0 else base_spacing
+
+        aggregated = []
+        for cluster in sorted(clusters, key=lambda c: station_index[c["rep"]]):
+            if len(cluster["members"]) < 2:
+                continue
+            others = sorted((m for m in cluster["members"] if m != cluster["rep"]),
+                            key=lambda m: station_rank(m, priorities))
+            aggregated.append([station_index[cluster["rep"]], [station_index[m] for m in others]])
+
+        levels.append({
+            "level": level,
+            "radius": radius,
+            "minZoom": round(screen_separation / level_spacing, 4) if level_spacing else 0,
+            "visibleCount": len(visible),
+            "hide": sorted(station_index[s] for s in previous_visible - visible),
+            "clusters": aggregated,
+        })
+        previous_visible = visible
+
+    return {"version": 1, "screenSeparation": screen_separation, "stations": station_ids, "levels": levels}
+
+def write_zoom_levels(coords_json, system_json, output_json, radii=DEFAULT_RADII,
+                      screen_separation=DEFAULT_SCREEN_SEPARATION, formats=("json-min",)):
+    """
+    Loads coordinates and interchange priorities, builds the zoom levels and writes them
+    once per format next to output_json. Also used by consolidate.py registry builds.
+    Returns the list of paths written (empty on failure).
+    """
+    try:
+        with open(coords_json, 'r', encoding='utf-8') as f:
+            coordinates = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        print(f"Error reading coordinates JSON '{coords_json}': {e}")
+        return []
+
+    positions = {station_id: (c["x"], c["y"]) for station_id, c in coordinates.items()}
+    priorities = load_station_priorities(system_json)
+    zoom_levels = build_zoom_levels(positions, priorities, radii, screen_separation)
+
+    try:
+        written_paths = write_output(zoom_levels, output_json, formats)
+    except IOError as e:
+        print(f"Error writing zoom levels to '{output_json}': {e}")
+        return []
+
+    print(f"Zoom levels for {len(zoom_levels['stations'])} stations saved to {', '.join(written_paths)}.")
+    for level in zoom_levels["levels"]:
+        print(f"  Level {level['level']}: radius {level['radius']:>5}, zoom >= {level['minZoom']:<6} "
+              f"{level['visibleCount']:>4} visible, {len(level['clusters'])} aggregated clusters")
+    return written_paths
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute zoom-level station clustering for level-of-detail rendering.")
+    parser.add_argument(
+        "--coords_json",
+        type=str,
+        default="data/figma_coordinates.json",
+        help="Path to the station coordinates JSON (output of extract_svg_coords.py)."
+    )
+    parser.add_argument(
+        "--system_json",
+        type=str,
+        default="data/consolidated_system_data.json",
+        help="Path to the consolidated system JSON, used to prioritize interchanges as cluster representatives."
+    )
+    parser.add_argument(
+        "--output_json",
+        type=str,
+        default="data/zoom_levels.json",
+        help="Base path for the zoom-level artifact. The written file name depends on --formats."
+    )
+    parser.add_argument(
+        "--radii",
+        type=str,
+        default=",".join(str(r) for r in DEFAULT_RADII),
+        help="Comma-separated clustering radii (in coordinate units) for each coarser level. Default is '30,60,120,240'."
+    )
+    parser.add_argument(
+        "--screen_separation",
+        type=float,
+        default=DEFAULT_SCREEN_SEPARATION,
+        help="Minimum on-screen distance in pixels between visible stations; sets each level's minZoom. Default is 24."
+    )
+    parser.add_argument(
+        "--formats",
+        type=str,
+        default="json-min",
+        help="Comma-separated output formats (see consolidate.py). Default is 'json-min', as loaded by the viewer."
+    )
+    args = parser.parse_args()
+
+    radii = [float(r) for r in args.radii.split(',') if r.strip()]
+    radii = [int(r) if r.is_integer() else r for r in radii] # Keep '30' rather than '30.0' in the artifact
+    write_zoom_levels(args.coords_json, args.system_json, args.output_json, radii,
+                      args.screen_separation, parse_formats(args.formats))
+
+if __name__ == "__main__":
+    main()
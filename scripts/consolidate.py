@@ -5,6 +5,14 @@ import re
 import json
 import time
 import argparse # For command-line arguments
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+
+try:
+    import msgpack # Optional: enables the "msgpack" output format
+except ImportError:
+    msgpack = None
 
 # --- Helper Functions (normalize_name_to_id, clean_text, parse_md_transfer_cell) ---
 # (These should be identical to what we've refined previously)
@@ -53,6 +61,16 @@ def normalize_name_to_id(name):
 ALL_PARSED_STATIONS_MASTER = {} 
 KNOWN_LINE_CODES_MASTER = set()
 
+# Default MD sources for the Istanbul network. Used when no --registry is given;
+# registry networks declare their own "sources" block with the same shape.
+DEFAULT_MD_SOURCES = {
+    "metro": {"path_fragment": "metro_data.md", "default_type": "Metro"},
+    "tram": {"path_fragment": "tram_data.md", "default_type": "Tram"},
+    "marmaray": {"path_fragment": "marmaray_data.md", "default_type": "Suburban Rail"},
+    "funicular": {"path_fragment": "funicular_data.md", "default_type": "Funicular"},
+    "metrobus": {"path_fragment": "metrobus_data.md", "default_type": "Metrobus"}, 
+}
+
 def parse_md_transfer_cell(cell_content, current_line_id):
     transfers = set()
     text_content = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', cell_content)
@@ -391,14 +409,209 @@ def merge_and_finalize_data(base_data, all_md_parsed_lines_by_type):
         
     return {"stations": final_stations_list, "lines": list(final_lines_lookup.values())}
 
+# --- Output Serializers ---
+# Every output file goes through write_output(). "json" is the original indented layout;
+# builds also write "columnar" by default, which the viewer loads first (see js/main.js).
+# Other backends are selected via --formats or a registry network's "formats".
+def encode_columnar(data):
+    """
+    Converts {"stations": [...], "lines": [...], ...} into a columnar layout:
+    each list of records becomes parallel arrays per field, and string values
+    (plus lists of strings) are replaced with indices into one shared string table.
+    Keys whose value is not a list of records are kept as-is under "extra".
+    """
+    strings, string_index = [], {}
+    def intern(value):
+        if value not in string_index:
+            string_index[value] = len(strings)
+            strings.append(value)
+        return string_index[value]
+
+    tables, extra = {}, {}
+    for key, value in data.items():
+        if not (isinstance(value, list) and value and all(isinstance(r, dict) for r in value)):
+            extra[key] = value
+            continue
+        fields = list(dict.fromkeys(field for record in value for field in record))
+        columns = {}
+        for field in fields:
+            present = [record[field] for record in value if field in record]
+            if all(v is None or isinstance(v, str) for v in present):
+                kind = "str"
+                encode_value = lambda v: None if v is None else intern(v)
+            elif all(isinstance(v, list) and all(isinstance(i, str) for i in v) for v in present):
+                kind = "str_list"
+                encode_value = lambda v: [intern(i) for i in v]
+            else:
+                kind = "raw"
+                encode_value = lambda v: v
+            column = {
+                "kind": kind,
+                "values": [encode_value(record[field]) if field in record else None for record in value],
+            }
+            absent_rows = [row for row, record in enumerate(value) if field not in record]
+            if absent_rows:
+                column["absent"] = absent_rows
+            columns[field] = column
+        tables[key] = {"length": len(value), "fields": fields, "columns": columns}
+
+    return {"format": "columnar", "version": 1, "order": list(data.keys()),
+            "strings": strings, "tables": tables, "extra": extra}
+
+def decode_columnar(payload):
+    """Inverse of encode_columnar(): rebuilds the list-of-records structure."""
+    strings = payload["strings"]
+    decoders = {
+        "str": lambda v: None if v is None else strings[v],
+        "str_list": lambda v: [strings[i] for i in v],
+        "raw": lambda v: v,
+    }
+    data = {}
+    for key in payload["order"]:
+        if key in payload["extra"]:
+            data[key] = payload["extra"][key]
+            continue
+        table = payload["tables"][key]
+        records = [{} for _ in range(table["length"])]
+        for field in table["fields"]:
+            column = table["columns"][field]
+            decode_value = decoders[column["kind"]]
+            absent_rows = set(column.get("absent", []))
+            for row, value in enumerate(column["values"]):
+                if row not in absent_rows:
+                    records[row][field] = decode_value(value)
+        data[key] = records
+    return data
+
+# File suffix per format, including formats whose backend may not be installed, so
+# write_output() can remove stale files of every known layout.
+FORMAT_SUFFIXES = {
+    "json": ".json",
+    "json-min": ".min.json",
+    "columnar": ".columnar.json",
+    "msgpack": ".msgpack",
+}
+# What a default build writes: the indented JSON plus the columnar layout the viewer loads first
+DEFAULT_OUTPUT_FORMATS = ["json", "columnar"]
+
+SERIALIZERS = {
+    "json": {
+        "suffix": FORMAT_SUFFIXES["json"],
+        "encode": lambda data: json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8'),
+        "decode": lambda raw: json.loads(raw.decode('utf-8')),
+    },
+    "json-min": {
+        "suffix": FORMAT_SUFFIXES["json-min"],
+        "encode": lambda data: json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+        "decode": lambda raw: json.loads(raw.decode('utf-8')),
+    },
+    "columnar": {
+        "suffix": FORMAT_SUFFIXES["columnar"],
+        "encode": lambda data: json.dumps(encode_columnar(data), ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+        "decode": lambda raw: decode_columnar(json.loads(raw.decode('utf-8'))),
+    },
+}
+if msgpack is not None:
+    SERIALIZERS["msgpack"] = {
+        "suffix": FORMAT_SUFFIXES["msgpack"],
+        "encode": lambda data: msgpack.packb(data, use_bin_type=True),
+        "decode": lambda raw: msgpack.unpackb(raw, raw=False),
+    }
+
+def serializer_output_path(output_path, format_name):
+    """Maps 'data/foo.json' to the path used for a given format, e.g. 'data/foo.min.json'."""
+    stem = output_path[:-len(".json")] if output_path.endswith(".json") else output_path
+    return stem + FORMAT_SUFFIXES[format_name]
+
+def parse_formats(formats_str):
+    """Parses a comma-separated --formats value, dropping unknown or unavailable backends."""
+    formats = []
+    for format_name in [f.strip() for f in formats_str.split(',') if f.strip()]:
+        if format_name in SERIALIZERS:
+            formats.append(format_name)
+        elif format_name == "msgpack":
+            print("Warning: format 'msgpack' requires the 'msgpack' package (pip install msgpack). Ignoring.")
+        else:
+            print(f"Warning: Unknown format '{format_name}' specified in --formats. Ignoring.")
+    return formats or list(DEFAULT_OUTPUT_FORMATS)
+
+def write_output(data, output_path, formats=tuple(DEFAULT_OUTPUT_FORMATS)):
+    """
+    Writes data once per requested format next to output_path, and removes the files of
+    every other known format so a stale layout (e.g. an old .columnar.json the viewer
+    prefers) can never shadow fresh data.
+    Returns the list of paths written, in the order of formats.
+    """
+    written_paths = []
+    for format_name in formats:
+        format_path = serializer_output_path(output_path, format_name)
+        with open(format_path, 'wb') as f:
+            f.write(SERIALIZERS[format_name]["encode"](data))
+        written_paths.append(format_path)
+    for format_name in FORMAT_SUFFIXES:
+        stale_path = serializer_output_path(output_path, format_name)
+        if format_name not in formats and os.path.exists(stale_path):
+            os.remove(stale_path)
+            print(f"  Removed stale '{format_name}' output '{stale_path}'.")
+    return written_paths
+
+def read_output(path, format_name=None):
+    """Reads a file written by write_output(). The format is inferred from the suffix if not given."""
+    if format_name is None:
+        # Longest suffix first so '.min.json' / '.columnar.json' win over '.json'
+        for candidate, serializer in sorted(SERIALIZERS.items(), key=lambda item: -len(item[1]["suffix"])):
+            if path.endswith(serializer["suffix"]):
+                format_name = candidate
+                break
+        else:
+            format_name = "json"
+    with open(path, 'rb') as f:
+        return SERIALIZERS[format_name]["decode"](f.read())
+
+def compare_serializers(data, repeat=5):
+    """
+    Encodes and decodes data with every available serializer and prints a
+    size / encode / decode comparison (best of `repeat` runs). Returns the rows.
+    """
+    rows = []
+    for format_name, serializer in SERIALIZERS.items():
+        encode_times, decode_times = [], []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            raw = serializer["encode"](data)
+            encode_times.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            decoded = serializer["decode"](raw)
+            decode_times.append(time.perf_counter() - started)
+        rows.append({
+            "format": format_name,
+            "bytes": len(raw),
+            "encode_ms": round(min(encode_times) * 1000, 3),
+            "decode_ms": round(min(decode_times) * 1000, 3),
+            "roundtrip_ok": decoded == data,
+        })
+
+    baseline_bytes = rows[0]["bytes"] or 1
+    print("\n--- Serializer comparison ---")
+    print(f"  {'format':<10} {'bytes':>10} {'size':>7} {'encode ms':>10} {'decode ms':>10}  roundtrip")
+    for row in rows:
+        print(f"  {row['format']:<10} {row['bytes']:>10} {row['bytes'] / baseline_bytes:>6.0%} "
+              f"{row['encode_ms']:>10} {row['decode_ms']:>10}  {'ok' if row['roundtrip_ok'] else 'MISMATCH'}")
+    if "msgpack" not in SERIALIZERS:
+        print("  (msgpack not installed; pip install msgpack to include it)")
+    return rows
+
 def process_single_type(type_key_arg, source_info_arg, args_arg, available_md_sources_arg):
     """
     Processes a single type:
     1. Parses its MD file.
     2. Saves raw parsed data to {type}_data.json.
     3. Consolidates this data and saves to consolidated_{type}_data.json.
+    Both files are written once per format in args_arg.formats (default: json only).
+    Returns the list of output paths that were written.
     """
     md_filepath = os.path.join(args_arg.md_dir.rstrip('/'), source_info_arg["path_fragment"])
+    output_formats = getattr(args_arg, "formats", None) or DEFAULT_OUTPUT_FORMATS
     default_line_type = source_info_arg["default_type"]
     
     # --- 1. Parse MD and generate {type}_data.json ---
@@ -435,28 +648,26 @@ def process_single_type(type_key_arg, source_info_arg, args_arg, available_md_so
     }
     
     try:
-        with open(type_data_output_path, 'w', encoding='utf-8') as f:
-            json.dump(type_specific_json_content, f, ensure_ascii=False, indent=2)
-        print(f"Saved raw parsed data for type '{type_key_arg}' to '{type_data_output_path}'.")
+        type_data_written_paths = write_output(type_specific_json_content, type_data_output_path, output_formats)
+        print(f"Saved raw parsed data for type '{type_key_arg}' to {', '.join(type_data_written_paths)}.")
     except IOError as e:
         print(f"Error writing raw parsed data for type '{type_key_arg}' to '{type_data_output_path}': {e}")
-        return # Stop processing this type if cannot write its data file
+        return [] # Stop processing this type if cannot write its data file
 
     # --- 2. Consolidate for this type using its own _data.json as base ---
     print(f"\n--- Consolidating data for type: {type_key_arg} ---")
-    current_base_json_path = type_data_output_path
+    current_base_json_path = type_data_written_paths[0]
     consolidated_output_filename = f"consolidated_{type_key_arg}_data.json"
     current_output_json_path = os.path.join(output_dir, consolidated_output_filename)
 
     base_data_for_type = {}
     try:
-        with open(current_base_json_path, 'r', encoding='utf-8') as f:
-            base_data_for_type = json.load(f)
+        base_data_for_type = read_output(current_base_json_path, output_formats[0])
         print(f"Successfully loaded base data for type '{type_key_arg}' from '{current_base_json_path}'.")
     except FileNotFoundError:
         print(f"Base JSON file '{current_base_json_path}' (created from MD) not found. This is unexpected. Starting with an empty dataset for consolidation.")
         base_data_for_type = {"stations": [], "lines": []}
-    except json.JSONDecodeError:
+    except ValueError: # json.JSONDecodeError and msgpack decode errors
         print(f"Error decoding base JSON from '{current_base_json_path}'. Starting empty.")
         base_data_for_type = {"stations": [], "lines": []}
     
@@ -470,97 +681,70 @@ def process_single_type(type_key_arg, source_info_arg, args_arg, available_md_so
     )
     
     try:
-        with open(current_output_json_path, 'w', encoding='utf-8') as f:
-            json.dump(final_output_for_type, f, ensure_ascii=False, indent=2)
-        print(f"Saved consolidated data for type '{type_key_arg}' to '{current_output_json_path}'.")
+        consolidated_written_paths = write_output(final_output_for_type, current_output_json_path, output_formats)
+        print(f"Saved consolidated data for type '{type_key_arg}' to {', '.join(consolidated_written_paths)}.")
         print(f"  Total stations: {len(final_output_for_type.get('stations', []))}")
         print(f"  Total lines: {len(final_output_for_type.get('lines', []))}")
     except IOError as e:
         print(f"Error writing consolidated data for type '{type_key_arg}' to '{current_output_json_path}': {e}")
+        return type_data_written_paths
+    return type_data_written_paths + consolidated_written_paths
 
-def main():
-    parser = argparse.ArgumentParser(description="Consolidate Istanbul rail network data from MD files into a single JSON.")
-    parser.add_argument(
-        "--types",
-        type=str,
-        default="all",
-        help="Comma-separated list of line types to process (e.g., 'metro,tram' or 'all'). Default is 'all'."
-    )
-    parser.add_argument(
-        "--base_json",
-        type=str,
-        default="data/system_data.json",
-        help="Path to the base JSON file to update (used when --types=all). If not found, starts fresh."
-    )
-    parser.add_argument(
-        "--output_json",
-        type=str,
-        default="data/consolidated_system_data.json",
-        help="Path to save the final consolidated JSON file (used when --types=all, also defines output dir for specific types)."
-    )
-    parser.add_argument(
-        "--md_dir",
-        type=str,
-        default="data/md_sources/",
-        help="Directory containing the Markdown source files (e.g., metro.md, tram.md)."
-    )
-    args = parser.parse_args()
-
-    AVAILABLE_MD_SOURCES = {
-        "metro": {"path_fragment": "metro_data.md", "default_type": "Metro"},
-        "tram": {"path_fragment": "tram_data.md", "default_type": "Tram"},
-        "marmaray": {"path_fragment": "marmaray_data.md", "default_type": "Suburban Rail"},
-        "funicular": {"path_fragment": "funicular_data.md", "default_type": "Funicular"},
-        "metrobus": {"path_fragment": "metrobus_data.md", "default_type": "Metrobus"}, 
-    }
-
-    types_to_process_str = args.types.lower()
-
-    if types_to_process_str != "all":
-        selected_types = [t.strip() for t in types_to_process_str.split(',')]
-        print(f"Processing specific types: {selected_types}")
-        for type_key in selected_types:
-            if type_key in AVAILABLE_MD_SOURCES:
-                source_info = AVAILABLE_MD_SOURCES[type_key]
-                process_single_type(type_key, source_info, args, AVAILABLE_MD_SOURCES)
-            else:
-                print(f"Warning: Unknown type '{type_key}' specified in --types. Ignoring.")
-        print("\nIndividual type processing complete.")
-        return # Exit after individual processing
-    
-    # --- Logic for "--types all" (original behavior) ---
+def consolidate_all_types(available_md_sources_arg, args_arg):
+    """
+    Processes every source in available_md_sources_arg into one consolidated file:
+    1. Loads the base JSON (args_arg.base_json) and seeds KNOWN_LINE_CODES_MASTER from it.
+    2. Parses each MD source, accumulating stations and lines.
+    3. Merges everything and saves to args_arg.output_json, once per format in args_arg.formats.
+    4. Prints a size / encode / decode comparison of every available serializer.
+    If args_arg.colors_json is set, its 'line_colors' are layered over the base colors.
+    Returns the list of output paths written (empty on failure).
+    """
     print("Processing all types as per 'all' or default.")
     md_sources_to_process_all = [] # Renamed to avoid conflict
-    for type_key, source_info in AVAILABLE_MD_SOURCES.items():
+    for type_key, source_info in available_md_sources_arg.items():
         md_sources_to_process_all.append({ # Use the new list name
-            "path": os.path.join(args.md_dir.rstrip('/'), source_info["path_fragment"]),
+            "path": os.path.join(args_arg.md_dir.rstrip('/'), source_info["path_fragment"]),
             "default_type": source_info["default_type"]
         })
 
     if not md_sources_to_process_all: # Check the new list name
-        print("No MD sources defined in AVAILABLE_MD_SOURCES. Exiting.")
-        return
+        print("No MD sources defined for 'all' mode. Exiting.")
+        return []
 
     # 1. Load base JSON for "all" mode
     base_line_colors = None
     consolidated_data = {"stations": [], "lines": []} # Default if file not found or error
+    KNOWN_LINE_CODES_MASTER.clear() # Start fresh for "all" mode context
     try:
-        with open(args.base_json, 'r', encoding='utf-8') as f:
+        with open(args_arg.base_json, 'r', encoding='utf-8') as f:
             consolidated_data = json.load(f)
-        print(f"Successfully loaded base data from '{args.base_json}' for 'all' mode.")
+        print(f"Successfully loaded base data from '{args_arg.base_json}' for 'all' mode.")
         if "line_colors" in consolidated_data:
             base_line_colors = consolidated_data["line_colors"]
             print("  Found 'line_colors' in base data. Will preserve.")
         # Populate KNOWN_LINE_CODES_MASTER from the base JSON for "all" mode
-        KNOWN_LINE_CODES_MASTER.clear() # Start fresh for "all" mode context
         for line_obj in consolidated_data.get("lines", []):
             KNOWN_LINE_CODES_MASTER.add(line_obj["id"].upper())
             for branch_key in line_obj.get("branches", {}).keys():
                  KNOWN_LINE_CODES_MASTER.add(branch_key.upper())
     except FileNotFoundError:
-        print(f"Base JSON file '{args.base_json}' not found for 'all' mode. Starting with an empty dataset.")
+        print(f"Base JSON file '{args_arg.base_json}' not found for 'all' mode. Starting with an empty dataset.")
     except json.JSONDecodeError:
-        print(f"Error decoding base JSON from '{args.base_json}' for 'all' mode. Starting empty.")
+        print(f"Error decoding base JSON from '{args_arg.base_json}' for 'all' mode. Starting empty.")
+
+    # Optional colors file (same shape as data/colors.json) overrides base colors per line
+    colors_json_path = getattr(args_arg, "colors_json", None)
+    if colors_json_path:
+        try:
+            with open(colors_json_path, 'r', encoding='utf-8') as f:
+                colors_from_file = json.load(f).get("line_colors", {})
+            base_line_colors = {**(base_line_colors or {}), **colors_from_file}
+            print(f"  Loaded {len(colors_from_file)} line colors from '{colors_json_path}'.")
+        except FileNotFoundError:
+            print(f"Colors JSON file '{colors_json_path}' not found. Keeping base colors.")
+        except json.JSONDecodeError:
+            print(f"Error decoding colors JSON from '{colors_json_path}'. Keeping base colors.")
 
     # 2. Process each MD file for "all" mode, accumulating data
     all_md_parsed_lines_by_type = {}
@@ -588,19 +772,397 @@ def main():
         print("  'line_colors' has been re-added to the final output for 'all' mode.")
 
     # 4. Save for "all" mode
-    output_dir_all = os.path.dirname(args.output_json)
+    output_dir_all = os.path.dirname(args_arg.output_json)
     if not os.path.exists(output_dir_all) and output_dir_all:
         os.makedirs(output_dir_all)
+    output_formats = getattr(args_arg, "formats", None) or DEFAULT_OUTPUT_FORMATS
     try:
-        with open(args.output_json, 'w', encoding='utf-8') as f:
-            json.dump(final_output_data, f, ensure_ascii=False, indent=2)
-        print(f"\nFully consolidated data for 'all' mode saved to '{args.output_json}'.")
+        written_paths = write_output(final_output_data, args_arg.output_json, output_formats)
+        print(f"\nFully consolidated data for 'all' mode saved to {', '.join(written_paths)}.")
         print(f"  Total stations: {len(final_output_data.get('stations', []))}")
         print(f"  Total lines: {len(final_output_data.get('lines', []))}")
         if "line_colors" in final_output_data:
             print(f"  'line_colors' object is present in the output.")
     except IOError as e:
-        print(f"Error writing final consolidated data for 'all' mode to '{args.output_json}': {e}")
+        print(f"Error writing final consolidated data for 'all' mode to '{args_arg.output_json}': {e}")
+        return []
+
+    compare_serializers(final_output_data)
+    return written_paths
+
+# --- Network Registry / Sharded Builds ---
+# A registry file (see data/networks.json) declares one or more networks. Each network
+# is built as an independent shard in its own process, so the module-level
+# ALL_PARSED_STATIONS_MASTER / KNOWN_LINE_CODES_MASTER state never leaks between shards.
+SHARD_BUILD_DIRNAME = ".build" # Per-shard cache fingerprints and logs, inside each output_dir
+
+def resolve_zoom_levels_entry(zoom_levels_entry, resolve):
+    """
+    Resolves a network's optional "zoom_levels" block (see scripts/build_zoom_levels.py).
+    Returns None when the network does not build a zoom-level artifact.
+    """
+    if not zoom_levels_entry:
+        return None
+    return {
+        "coords_json": resolve(zoom_levels_entry.get("coords_json", "figma_coordinates.json")),
+        "output_json": resolve(zoom_levels_entry.get("output_json", "zoom_levels.json")),
+        "radii": zoom_levels_entry.get("radii"),
+        "screen_separation": zoom_levels_entry.get("screen_separation"),
+        "formats": zoom_levels_entry.get("formats", ["json-min"]),
+    }
+
+def load_network_registry(registry_path):
+    """
+    Loads a network registry and resolves every path in it relative to the registry file.
+    Returns (networks, index_json_path). Each network dict gets absolute paths and a
+    'sources' block (falling back to DEFAULT_MD_SOURCES) plus a 'types' list to build.
+    Raises ValueError if two networks share an id or an output location, since their
+    shards would overwrite each other's outputs, cache and log while running in parallel.
+    """
+    with open(registry_path, 'r', encoding='utf-8') as f:
+        registry = json.load(f)
+
+    registry_dir = os.path.dirname(os.path.abspath(registry_path))
+    resolve = lambda p: os.path.normpath(os.path.join(registry_dir, p)) if p else None
+
+    networks = []
+    for network_entry in registry.get("networks", []):
+        network_id = network_entry["id"]
+        sources = network_entry.get("sources", DEFAULT_MD_SOURCES)
+        output_dir = resolve(network_entry.get("output_dir", network_id))
+        networks.append({
+            "id": network_id,
+            "name": network_entry.get("name", network_id),
+            "sources": sources,
+            "types": network_entry.get("default_types", list(sources.keys())),
+            "types_only": False, # Set by --types: per-type files only, like the non-registry path
+            "formats": network_entry.get("formats", DEFAULT_OUTPUT_FORMATS),
+            "md_dir": resolve(network_entry.get("md_dir", "md_sources/")),
+            "base_json": resolve(network_entry.get("base_json")),
+            "colors_json": resolve(network_entry.get("colors_json")),
+            "output_dir": output_dir,
+            "output_json": os.path.join(output_dir, network_entry.get("output_json", "consolidated_system_data.json")),
+            "zoom_levels": resolve_zoom_levels_entry(network_entry.get("zoom_levels"), resolve),
+            "entry": network_entry, # Raw entry, part of the cache fingerprint
+        })
+
+    seen_ids, seen_output_dirs = {}, {}
+    for network in networks:
+        if network["id"] in seen_ids:
+            raise ValueError(f"Duplicate network id '{network['id']}' in registry '{registry_path}'.")
+        seen_ids[network["id"]] = network
+        # Per-type files go next to output_json, cache and log go under output_dir
+        for output_dir in {network["output_dir"], os.path.dirname(network["output_json"])}:
+            if output_dir in seen_output_dirs:
+                raise ValueError(f"Networks '{seen_output_dirs[output_dir]}' and '{network['id']}' in registry "
+                                 f"'{registry_path}' share the output directory '{output_dir}'.")
+            seen_output_dirs[output_dir] = network["id"]
+
+    index_json_path = resolve(registry.get("index_json", "networks_index.json"))
+    return networks, index_json_path
+
+def shard_fingerprint(network):
+    """
+    Hashes everything a shard's outputs depend on: its registry entry, the types and
+    formats being built, the MD sources, base/colors JSON and this script itself.
+    Missing files hash as absent, so creating one later invalidates the cache.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(network["entry"], sort_keys=True).encode('utf-8'))
+    digest.update(json.dumps([network["types"], network["types_only"]]).encode('utf-8'))
+    digest.update(json.dumps(network["formats"]).encode('utf-8'))
+
+    input_paths = [os.path.join(network["md_dir"], source_info["path_fragment"])
+                   for source_info in network["sources"].values()]
+    input_paths += [network["base_json"], network["colors_json"], os.path.abspath(__file__)]
+    if network["zoom_levels"]:
+        input_paths += [network["zoom_levels"]["coords_json"],
+                        os.path.join(os.path.dirname(os.path.abspath(__file__)), "build_zoom_levels.py")]
+    for path in input_paths:
+        digest.update(str(path).encode('utf-8'))
+        if path and os.path.exists(path):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        else:
+            digest.update(b"<missing>")
+    return digest.hexdigest()
+
+def run_zoom_levels_stage(zoom_levels_config, consolidated_paths):
+    """
+    Runs the zoom-level stage on freshly consolidated data, so interchanges come from
+    this build. Called after every full build: the default 'all' run and registry shards.
+    Returns the paths written.
+    """
+    from build_zoom_levels import write_zoom_levels, DEFAULT_RADII, DEFAULT_SCREEN_SEPARATION # Imports this module
+    print(f"\n--- Building zoom levels from '{zoom_levels_config['coords_json']}' ---")
+    return write_zoom_levels(
+        zoom_levels_config["coords_json"],
+        consolidated_paths[0],
+        zoom_levels_config["output_json"],
+        zoom_levels_config["radii"] or DEFAULT_RADII,
+        zoom_levels_config["screen_separation"] or DEFAULT_SCREEN_SEPARATION,
+        parse_formats(",".join(zoom_levels_config["formats"])),
+    )
+
+def build_network_shard(network, force=False):
+    """
+    Builds one network shard: every type in network['types'] via process_single_type,
+    then the consolidated file for the same types, then the zoom-level artifact if the
+    network declares "zoom_levels". With network['types_only'] (from --types) only the
+    per-type files are written, so a partial run never overwrites the network's full
+    consolidated output. Skipped when the cached fingerprint matches and all previous
+    outputs still exist. Build output goes to a per-shard log.
+    Returns a summary dict used for the index manifest.
+    """
+    started = time.time()
+    build_dir = os.path.join(network["output_dir"], SHARD_BUILD_DIRNAME)
+    os.makedirs(build_dir, exist_ok=True)
+    cache_path = os.path.join(build_dir, f"{network['id']}.cache.json")
+    log_path = os.path.join(build_dir, f"{network['id']}.log")
+
+    fingerprint = shard_fingerprint(network)
+    cached = None
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+
+    if not force and cached and cached.get("fingerprint") == fingerprint and \
+       cached.get("outputs") and all(os.path.exists(p) for p in cached["outputs"]):
+        return {"id": network["id"], "name": network["name"], "status": "cached", "partial": network["types_only"],
+                "seconds": round(time.time() - started, 3), "outputs": cached["outputs"]}
+
+    shard_sources = {t: network["sources"][t] for t in network["types"] if t in network["sources"]}
+    shard_args = argparse.Namespace(
+        md_dir=network["md_dir"],
+        base_json=network["base_json"] or "",
+        colors_json=network["colors_json"],
+        output_json=network["output_json"],
+        formats=network["formats"],
+    )
+
+    outputs = []
+    with open(log_path, 'w', encoding='utf-8') as log_file, redirect_stdout(log_file):
+        for type_key in network["types"]:
+            if type_key not in shard_sources:
+                print(f"Warning: Unknown type '{type_key}' for network '{network['id']}'. Ignoring.")
+                continue
+            outputs.extend(process_single_type(type_key, shard_sources[type_key], shard_args, shard_sources))
+        if network["types_only"]:
+            print("\nIndividual type processing complete. Skipping consolidated and zoom-level outputs.")
+        else:
+            consolidated_paths = consolidate_all_types(shard_sources, shard_args)
+            outputs.extend(consolidated_paths)
+            if network["zoom_levels"]:
+                outputs.extend(run_zoom_levels_stage(network["zoom_levels"], consolidated_paths or [network["output_json"]]))
+
+    with open(cache_path, 'w', encoding='utf-8') as f:
+        json.dump({"fingerprint": fingerprint, "outputs": outputs}, f, ensure_ascii=False, indent=2)
+
+    return {"id": network["id"], "name": network["name"], "status": "built", "partial": network["types_only"],
+            "seconds": round(time.time() - started, 3), "outputs": outputs}
+
+def write_network_index(shard_results, index_json_path, registry_network_ids):
+    """
+    Writes the combined index manifest: every shard's outputs with their sizes in bytes.
+    Paths are stored relative to the manifest's directory. Networks in the registry that
+    were not part of this run keep their entry from the existing manifest, and partial
+    (--types) runs update only their own files within it. Failed shards are recorded with
+    status 'failed' and the error message.
+    """
+    index_dir = os.path.dirname(index_json_path)
+    previous_entries = {}
+    try:
+        with open(index_json_path, 'r', encoding='utf-8') as f:
+            previous_entries = {entry["id"]: entry for entry in json.load(f).get("networks", [])}
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+
+    manifest = {"generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "networks": []}
+    for network_id in registry_network_ids: # Registry order regardless of completion order
+        result = shard_results.get(network_id)
+        if result is None:
+            if network_id in previous_entries:
+                manifest["networks"].append(previous_entries[network_id])
+            continue
+        if result.get("error"):
+            manifest["networks"].append({"id": result["id"], "name": result["name"],
+                                         "status": "failed", "error": result["error"]})
+            continue
+        outputs = [{"path": os.path.relpath(p, index_dir).replace(os.sep, '/'), "bytes": os.path.getsize(p)}
+                   for p in result["outputs"] if os.path.exists(p)]
+        if result["partial"] and network_id in previous_entries:
+            updated_paths = {o["path"] for o in outputs}
+            outputs = [o for o in previous_entries[network_id].get("outputs", []) if o["path"] not in updated_paths] + outputs
+        manifest["networks"].append({
+            "id": result["id"],
+            "name": result["name"],
+            "status": result["status"],
+            "seconds": result["seconds"],
+            "total_bytes": sum(o["bytes"] for o in outputs),
+            "outputs": outputs,
+        })
+    if index_dir and not os.path.exists(index_dir):
+        os.makedirs(index_dir)
+    with open(index_json_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+def build_network_fleet(registry_path, selected_network_ids=None, selected_types=None, selected_formats=None,
+                        jobs=None, force=False):
+    """
+    Builds every network in the registry in parallel (one process per shard) and writes
+    the combined index manifest. Wall time is bounded by the slowest shard.
+    """
+    try:
+        networks, index_json_path = load_network_registry(registry_path)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return None
+    registry_network_ids = [n["id"] for n in networks]
+    if selected_network_ids:
+        unknown_ids = set(selected_network_ids) - {n["id"] for n in networks}
+        for network_id in sorted(unknown_ids):
+            print(f"Warning: Unknown network '{network_id}' specified in --networks. Ignoring.")
+        networks = [n for n in networks if n["id"] in selected_network_ids]
+    if selected_types:
+        for network in networks:
+            network["types"] = selected_types
+            network["types_only"] = True
+    if selected_formats:
+        for network in networks:
+            network["formats"] = selected_formats
+    if not networks:
+        print(f"No networks to build from registry '{registry_path}'. Exiting.")
+        return None
+
+    print(f"Building {len(networks)} network shard(s) from '{registry_path}'...")
+    fleet_started = time.time()
+    shard_results = {}
+    with ProcessPoolExecutor(max_workers=jobs or len(networks)) as executor:
+        futures = {executor.submit(build_network_shard, network, force): network for network in networks}
+        for future in as_completed(futures):
+            network = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Error building network '{network['id']}': {e}")
+                shard_results[network["id"]] = {"id": network["id"], "name": network["name"], "error": str(e)}
+                continue
+            shard_results[network["id"]] = result
+            status = "cached" if result["status"] == "cached" else f"built in {result['seconds']}s"
+            print(f"  [{network['id']}] {status}, {len(result['outputs'])} output(s).")
+
+    manifest = write_network_index(shard_results, index_json_path, registry_network_ids)
+    print(f"\nFleet build finished in {time.time() - fleet_started:.2f}s. Index saved to '{index_json_path}'.")
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description="Consolidate Istanbul rail network data from MD files into a single JSON.")
+    parser.add_argument(
+        "--types",
+        type=str,
+        default="all",
+        help="Comma-separated list of line types to process (e.g., 'metro,tram' or 'all'). Default is 'all'."
+    )
+    parser.add_argument(
+        "--base_json",
+        type=str,
+        default="data/system_data.json",
+        help="Path to the base JSON file to update (used when --types=all). If not found, starts fresh."
+    )
+    parser.add_argument(
+        "--output_json",
+        type=str,
+        default="data/consolidated_system_data.json",
+        help="Path to save the final consolidated JSON file (used when --types=all, also defines output dir for specific types)."
+    )
+    parser.add_argument(
+        "--md_dir",
+        type=str,
+        default="data/md_sources/",
+        help="Directory containing the Markdown source files (e.g., metro.md, tram.md)."
+    )
+    parser.add_argument(
+        "--coords_json",
+        type=str,
+        default="data/figma_coordinates.json",
+        help="Station coordinates for the zoom-level stage (used when --types=all)."
+    )
+    parser.add_argument(
+        "--zoom_levels_json",
+        type=str,
+        default="data/zoom_levels.json",
+        help="Base path for the zoom-level artifact rebuilt after an 'all' build (written as .min.json, "
+             "as loaded by the viewer). Pass an empty string to skip the stage."
+    )
+    parser.add_argument(
+        "--formats",
+        type=str,
+        default=None,
+        help="Comma-separated output formats: json, json-min, columnar, msgpack (requires the msgpack package). "
+             "Default is 'json,columnar' (the viewer loads columnar, falling back to json). "
+             "Files of formats not written are removed. Overrides registry 'formats' when given."
+    )
+    parser.add_argument(
+        "--registry",
+        type=str,
+        default=None,
+        help="Path to a network registry JSON (e.g., data/networks.json). Builds every network as a parallel shard; "
+             "--base_json, --output_json and --md_dir are then taken from the registry."
+    )
+    parser.add_argument(
+        "--networks",
+        type=str,
+        default=None,
+        help="Comma-separated list of registry network ids to build (with --registry). Default is every network."
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Maximum number of shards to build in parallel (with --registry). Default is one per network."
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild registry shards even if their cached fingerprint is unchanged."
+    )
+    args = parser.parse_args()
+    selected_formats = parse_formats(args.formats) if args.formats else None
+    args.formats = selected_formats or DEFAULT_OUTPUT_FORMATS
+
+    types_to_process_str = args.types.lower()
+
+    if args.registry:
+        selected_network_ids = [n.strip() for n in args.networks.split(',')] if args.networks else None
+        selected_types = [t.strip() for t in types_to_process_str.split(',')] if types_to_process_str != "all" else None
+        build_network_fleet(args.registry, selected_network_ids, selected_types, selected_formats, args.jobs, args.force)
+        return
+
+    if types_to_process_str != "all":
+        selected_types = [t.strip() for t in types_to_process_str.split(',')]
+        print(f"Processing specific types: {selected_types}")
+        for type_key in selected_types:
+            if type_key in DEFAULT_MD_SOURCES:
+                source_info = DEFAULT_MD_SOURCES[type_key]
+                process_single_type(type_key, source_info, args, DEFAULT_MD_SOURCES)
+            else:
+                print(f"Warning: Unknown type '{type_key}' specified in --types. Ignoring.")
+        print("\nIndividual type processing complete.")
+        return # Exit after individual processing
+    
+    # --- Logic for "--types all" (original behavior) ---
+    consolidated_paths = consolidate_all_types(DEFAULT_MD_SOURCES, args)
+
+    # Keep the viewer's zoom levels in step with the interchange data just written
+    if args.zoom_levels_json and consolidated_paths:
+        run_zoom_levels_stage(
+            {"coords_json": args.coords_json, "output_json": args.zoom_levels_json,
+             "radii": None, "screen_separation": None, "formats": ["json-min"]},
+            consolidated_paths,
+        )
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()